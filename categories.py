@@ -5,11 +5,167 @@ Rules are loaded from category_rules.yaml (copy from category_rules.example.yaml
 See that file for format documentation.
 """
 
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import yaml
 
+try:
+    # libyaml-backed parser; same safe semantics as yaml.safe_load
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: falls back to a linear keyword scan
+    ahocorasick = None
+
+
+# Shared result for "nothing to match"; categorize_transaction checks for it
+# by identity and skips all lookups
+_EMPTY_RULES = {
+    'type_rules': [],
+    'merchant_rules': [],
+    'dispatch': {},
+}
+
+# Per-type categorization handler: (sub_type, merchant) -> category
+Handler = Callable[[Optional[str], str], str]
+
+
+def _intern(value):
+    """Intern rule strings so repeated categories/types share one object."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _build_merchant_automaton(merchant_rules: List[Tuple[str, str]]):
+    """Compile merchant keywords into an Aho-Corasick automaton.
+
+    Each keyword maps to (rule_index, category) so that the lowest index
+    among all hits reproduces the first-match-wins ordering of the rules file.
+
+    Returns:
+        An ahocorasick.Automaton, or None if pyahocorasick is not installed
+        or there are no merchant rules.
+    """
+    if ahocorasick is None or not merchant_rules:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for index, (keyword, category) in enumerate(merchant_rules):
+        # Keep the earliest rule for duplicate keywords
+        if keyword not in automaton:
+            automaton.add_word(keyword, (index, category))
+    automaton.make_automaton()
+    return automaton
+
+
+def _bucket_merchant_rules(merchant_rules: List[Tuple[str, str]]) -> Dict[str, List[tuple]]:
+    """Group merchant rules by the first character of their keyword.
+
+    Used for matching when pyahocorasick is unavailable: a keyword can only
+    match if its first character appears in the merchant name, so whole
+    buckets can be skipped. Entries are (rule_index, keyword, category)
+    tuples in rule order.
+    """
+    buckets = {}
+    for index, (keyword, category) in enumerate(merchant_rules):
+        buckets.setdefault(keyword[:1], []).append((index, keyword, category))
+    return buckets
+
+
+def _index_type_rules(type_rules: List[dict]) -> Tuple[Dict[tuple, str], Dict[str, str]]:
+    """Bucket type rules for constant-time lookup.
+
+    Returns:
+        A (type_index, type_default) pair: type_index maps (type, subtype) to
+        the first matching rule's category, type_default maps type to the
+        first subtype-less rule's category.
+    """
+    type_index = {}
+    type_default = {}
+    for rule in type_rules:
+        rule_type = _intern(rule.get('type'))
+        rule_subtype = _intern(rule.get('subtype'))
+        category = _intern(rule['category'])
+        if rule_subtype is not None:
+            type_index.setdefault((rule_type, rule_subtype), category)
+        else:
+            type_default.setdefault(rule_type, category)
+    return type_index, type_default
+
+
+def _match_merchant(merchant_lower: str, automaton, buckets: Dict[str, List[tuple]]) -> str:
+    """Return the category of the first merchant rule whose keyword matches."""
+    if automaton is not None:
+        # Single pass over the merchant name; lowest rule index wins
+        hit = min(automaton.iter(merchant_lower), key=lambda h: h[1][0], default=None)
+        return hit[1][1] if hit is not None else ''
+
+    # Only scan buckets for characters present in the merchant name,
+    # keeping the lowest rule index across buckets
+    best = None
+    for char in set(merchant_lower):
+        for index, keyword, category in buckets.get(char, ()):
+            if best is not None and index >= best[0]:
+                break
+            if keyword in merchant_lower:
+                best = (index, category)
+                break
+
+    return best[1] if best is not None else ''
+
+
+def _make_type_handler(subtype_map: Dict[str, str], default: str) -> Handler:
+    """Handler for ordinary types: exact subtype rule, else the type-only rule."""
+    def handler(sub_type: Optional[str], merchant: str) -> str:
+        return subtype_map.get(sub_type, default)
+    return handler
+
+
+def _make_credit_card_handler(subtype_map: Dict[str, str], merchant_rules: List[Tuple[str, str]]) -> Handler:
+    """Handler for CREDIT_CARD transactions.
+
+    Subtype rules (e.g., PAYMENT) win; otherwise the merchant name is matched
+    against merchant_rules. Merchant results are memoized, since the same
+    merchants repeat throughout a transaction history.
+    """
+    automaton = _build_merchant_automaton(merchant_rules)
+    buckets = _bucket_merchant_rules(merchant_rules) if automaton is None else {}
+    merchant_cache = {}
+
+    def handler(sub_type: Optional[str], merchant: str) -> str:
+        category = subtype_map.get(sub_type)
+        if category is not None:
+            return category
+        category = merchant_cache.get(merchant)
+        if category is None:
+            category = merchant_cache[merchant] = _match_merchant(merchant.lower(), automaton, buckets)
+        return category
+    return handler
+
+
+def _build_dispatch(type_rules: List[dict], merchant_rules: List[Tuple[str, str]]) -> Dict[str, Handler]:
+    """Build the tx_type -> handler table used by categorize_transaction.
+
+    Each handler closes over only the rules for its own type.
+    """
+    type_index, type_default = _index_type_rules(type_rules)
+    subtype_maps = {}
+    for (rule_type, subtype), category in type_index.items():
+        subtype_maps.setdefault(rule_type, {})[subtype] = category
+
+    dispatch = {
+        rule_type: _make_type_handler(subtype_maps.get(rule_type, {}), type_default.get(rule_type, ''))
+        for rule_type in set(subtype_maps) | set(type_default)
+    }
+    # CREDIT_CARD always needs a handler for merchant matching; subtype-less
+    # CREDIT_CARD type rules don't apply to it
+    dispatch['CREDIT_CARD'] = _make_credit_card_handler(subtype_maps.get('CREDIT_CARD', {}), merchant_rules)
+    return dispatch
+
 
 def load_rules(path: Optional[Path] = None) -> dict:
     """Load category rules from a YAML file.
@@ -19,8 +175,11 @@ def load_rules(path: Optional[Path] = None) -> dict:
               in the same directory as this module.
 
     Returns:
-        Parsed rules dict with 'type_rules' and 'merchant_rules' keys.
-        Returns empty rules if the file doesn't exist.
+        Parsed rules dict with 'type_rules' and 'merchant_rules' keys
+        (the latter normalized to (lowercased keyword, category) tuples), plus
+        a precompiled 'dispatch' table of per-type handlers.
+        Returns the shared empty rules if the file doesn't exist or
+        defines no rules.
     """
     if path is None:
         path = Path(__file__).parent / 'category_rules.yaml'
@@ -29,14 +188,24 @@ def load_rules(path: Optional[Path] = None) -> dict:
         print(f"Warning: Category rules file not found: {path}")
         print("  Transactions will not be categorized.")
         print("  Copy category_rules.example.yaml to category_rules.yaml to enable.")
-        return {'type_rules': [], 'merchant_rules': []}
+        return _EMPTY_RULES
 
     with open(path, 'r', encoding='utf-8') as f:
-        rules = yaml.safe_load(f)
+        rules = yaml.load(f, Loader=YamlLoader)
+
+    type_rules = rules.get('type_rules', [])
+    # Keywords match case-insensitively, so lowercase them once here
+    merchant_rules = [
+        (rule['keyword'].lower(), _intern(rule['category']))
+        for rule in rules.get('merchant_rules', [])
+    ]
+    if not type_rules and not merchant_rules:
+        return _EMPTY_RULES
 
     return {
-        'type_rules': rules.get('type_rules', []),
-        'merchant_rules': rules.get('merchant_rules', []),
+        'type_rules': type_rules,
+        'merchant_rules': merchant_rules,
+        'dispatch': _build_dispatch(type_rules, merchant_rules),
     }
 
 
@@ -57,41 +226,10 @@ def categorize_transaction(
     Returns:
         Category string, or empty string if no match.
     """
-    type_rules = rules.get('type_rules', [])
-    merchant_rules = rules.get('merchant_rules', [])
-
-    # For CREDIT_CARD transactions, check type rules for specific subtypes first
-    # (e.g., PAYMENT), then fall through to merchant matching for PURCHASE/REFUND.
-    if tx_type == 'CREDIT_CARD':
-        # Check if there's a type rule for this specific subtype
-        for rule in type_rules:
-            if rule.get('type') != tx_type:
-                continue
-            rule_subtype = rule.get('subtype')
-            if rule_subtype is not None and rule_subtype == sub_type:
-                return rule['category']
-
-        # Fall through to merchant keyword matching
-        merchant_lower = merchant.lower()
-        for rule in merchant_rules:
-            if rule['keyword'] in merchant_lower:
-                return rule['category']
-
+    if rules is _EMPTY_RULES:
         return ''
 
-    # For all other transaction types, match type rules
-    # Try specific (type + subtype) first, then type-only
-    best_match = None
-    for rule in type_rules:
-        if rule.get('type') != tx_type:
-            continue
-        rule_subtype = rule.get('subtype')
-        if rule_subtype is not None and rule_subtype == sub_type:
-            return rule['category']  # Exact match, return immediately
-        if rule_subtype is None and best_match is None:
-            best_match = rule['category']  # General match, keep as fallback
-
-    if best_match is not None:
-        return best_match
-
-    return ''
+    handler = rules.get('dispatch', {}).get(tx_type)
+    if handler is None:
+        return ''
+    return handler(sub_type, merchant)
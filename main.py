@@ -8,44 +8,70 @@ and balance history, and exports them as CSV files formatted for Monarch Money.
 
 import argparse
 import csv
+import io
 import json
 import keyring
 import os
 import sys
 import tty
 import termios
-import yaml
+import threading
 import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Tuple
 
 from ws_api import WealthsimpleAPI, OTPRequiredException, LoginFailedException, WSAPISession
 
+try:
+    # C parser; accepts the 'Z' UTC suffix directly
+    from ciso8601 import parse_datetime
+except ImportError:  # Optional: fall back to the stdlib parser
+    def parse_datetime(date_str: str) -> datetime:
+        # fromisoformat() only accepts 'Z' from Python 3.11
+        if date_str.endswith('Z'):
+            date_str = date_str[:-1] + '+00:00'
+        return datetime.fromisoformat(date_str)
+
 from categories import load_rules, categorize_transaction
 
+# Accounts are fetched concurrently; requests are network-bound
+MAX_FETCH_WORKERS = 8
 
-def read_key() -> str:
-    """Read a single keypress, handling arrow keys and special keys."""
-    fd = sys.stdin.fileno()
+
+@contextmanager
+def raw_mode(fd: int):
+    """Put the terminal in raw mode for the duration of the block."""
     old_settings = termios.tcgetattr(fd)
     try:
         tty.setraw(fd)
-        ch = sys.stdin.read(1)
-        if ch == '\x1b':  # Escape sequence
-            ch2 = sys.stdin.read(1)
-            if ch2 == '[':
-                ch3 = sys.stdin.read(1)
-                if ch3 == 'A':
-                    return 'up'
-                elif ch3 == 'B':
-                    return 'down'
-            return 'escape'
-        return ch
+        yield
     finally:
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
 
 
+def read_key() -> str:
+    """Read a single keypress, handling arrow keys and special keys.
+
+    The terminal must already be in raw mode (see raw_mode).
+    """
+    ch = sys.stdin.read(1)
+    if ch == '\x1b':  # Escape sequence
+        ch2 = sys.stdin.read(1)
+        if ch2 == '[':
+            ch3 = sys.stdin.read(1)
+            if ch3 == 'A':
+                return 'up'
+            elif ch3 == 'B':
+                return 'down'
+        return 'escape'
+    return ch
+
+
 def get_terminal_width() -> int:
     """Get terminal width, defaulting to 80."""
     try:
@@ -70,57 +96,67 @@ def interactive_select(items: List[str]) -> List[int]:
     num_lines = total_lines + 2
     CLEAR_LINE = '\x1b[2K'  # ANSI: erase entire line
 
+    def render_line(i):
+        arrow = '>' if i == cursor else ' '
+        check = 'x' if selected[i] else ' '
+        if i == 0:
+            line = f"  {arrow} [{check}] 0. All"
+        else:
+            line = f"  {arrow} [{check}] {i:>2}. {items[i - 1]}"
+        # Truncate to terminal width to prevent wrapping
+        return line[:term_width]
+
     def render():
-        lines = []
-        for i in range(total_lines):
-            arrow = '>' if i == cursor else ' '
-            check = 'x' if selected[i] else ' '
-            if i == 0:
-                line = f"  {arrow} [{check}] 0. All"
-            else:
-                line = f"  {arrow} [{check}] {i:>2}. {items[i - 1]}"
-            # Truncate to terminal width to prevent wrapping
-            lines.append(line[:term_width])
+        lines = [render_line(i) for i in range(total_lines)]
         lines.append("")
         lines.append("  j/\u2193 down  k/\u2191 up  enter toggle  q confirm")
         return lines
 
+    def redraw_line(i):
+        # Move up from the help line to row i, clear and rewrite it, move back
+        offset = num_lines - 1 - i
+        sys.stdout.write(f'\x1b[{offset}A\r{CLEAR_LINE}{render_line(i)}\x1b[{offset}B')
+
     # Initial draw
     output = render()
     sys.stdout.write('\n'.join(output))
     sys.stdout.flush()
 
-    while True:
-        key = read_key()
-
-        if key in ('j', 'down'):
-            cursor = min(cursor + 1, total_lines - 1)
-        elif key in ('k', 'up'):
-            cursor = max(cursor - 1, 0)
-        elif key in ('\r', '\n', ' '):
-            if cursor == 0:
-                # Toggle All
-                new_state = not selected[0]
-                selected = [new_state] * (len(items) + 1)
+    # Stay in raw mode for the whole menu rather than toggling per keypress
+    with raw_mode(sys.stdin.fileno()):
+        while True:
+            key = read_key()
+
+            # Only rows whose arrow or checkbox changed are redrawn
+            if key in ('j', 'down', 'k', 'up'):
+                prev_cursor = cursor
+                if key in ('j', 'down'):
+                    cursor = min(cursor + 1, total_lines - 1)
+                else:
+                    cursor = max(cursor - 1, 0)
+                changed = {prev_cursor, cursor} if cursor != prev_cursor else set()
+            elif key in ('\r', '\n', ' '):
+                if cursor == 0:
+                    # Toggle All
+                    new_state = not selected[0]
+                    selected = [new_state] * (len(items) + 1)
+                    changed = set(range(total_lines))
+                else:
+                    selected[cursor] = not selected[cursor]
+                    # Update All: checked if all individual items are selected
+                    prev_all = selected[0]
+                    selected[0] = all(selected[1:])
+                    changed = {cursor, 0} if selected[0] != prev_all else {cursor}
+            elif key == 'q':
+                break
+            elif key == 'escape':
+                break
             else:
-                selected[cursor] = not selected[cursor]
-                # Update All: checked if all individual items are selected
-                selected[0] = all(selected[1:])
-        elif key == 'q':
-            break
-        elif key == 'escape':
-            break
-        else:
-            continue
+                continue
 
-        # Move cursor up to top of menu, clear each line, and redraw
-        sys.stdout.write(f'\x1b[{num_lines - 1}A\r')
-        output = render()
-        for i, line in enumerate(output):
-            sys.stdout.write(f'{CLEAR_LINE}{line}')
-            if i < len(output) - 1:
-                sys.stdout.write('\n')
-        sys.stdout.flush()
+            for i in sorted(changed):
+                redraw_line(i)
+            sys.stdout.flush()
 
     # Move past the menu
     sys.stdout.write('\n')
@@ -132,62 +168,108 @@ def interactive_select(items: List[str]) -> List[int]:
     return indices
 
 
+# Characters that are invalid in filenames, mapped to underscores
+FILENAME_TRANSLATION = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+
+
 def sanitize_filename(name: str) -> str:
     """Remove or replace characters that are invalid in filenames."""
     # Replace invalid characters with underscores
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', name)
+    sanitized = name.translate(FILENAME_TRANSLATION)
     # Remove leading/trailing spaces and dots
     sanitized = sanitized.strip(' .')
     return sanitized
 
 
+# Date strings format_date_for_monarch couldn't parse; main() reports them
+# once after all accounts are exported
+unparsed_dates = set()
+
+
+@lru_cache(maxsize=65536)
 def format_date_for_monarch(date_str: str) -> str:
-    """Convert Wealthsimple date format to Monarch's MM/DD/YYYY format."""
+    """Convert Wealthsimple date format to Monarch's MM/DD/YYYY format.
+
+    Results are cached per input string, since balance history and
+    same-day transactions repeat the same dates many times. Unparseable
+    dates are returned unchanged and recorded in unparsed_dates.
+    """
     try:
+        # Fast path for the usual 'YYYY-MM-DDTHH:MM:SS...' shape: the date
+        # part is already there, so reorder it without building a datetime.
+        # Only years 1000+ and days that exist in every month (01-28)
+        # qualify; anything else, including impossible dates, goes through
+        # the parser.
+        year, month, day = date_str[:4], date_str[5:7], date_str[8:10]
+        if (len(date_str) >= 10 and date_str[4] == '-' and date_str[7] == '-'
+                and (year + month + day).isascii() and (year + month + day).isdigit()
+                and year >= '1000' and '01' <= month <= '12' and '01' <= day <= '28'):
+            return month + '/' + day + '/' + year
+
         # Parse the ISO format date from Wealthsimple
-        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        dt = parse_datetime(date_str)
         # Format as MM/DD/YYYY
         return dt.strftime('%m/%d/%Y')
-    except (ValueError, AttributeError) as e:
-        print(f"Warning: Could not parse date '{date_str}': {e}")
+    except (ValueError, AttributeError, TypeError):
+        unparsed_dates.add(date_str)
         return date_str
 
 
-def convert_transaction_to_monarch(transaction: dict, account_description: str, rules: dict) -> dict:
-    """Convert a Wealthsimple transaction to Monarch CSV format."""
+# Common prefixes that ws-api/Wealthsimple adds to descriptions
+# Order matters: check longer/more specific prefixes first
+PREFIXES_TO_REMOVE = (
+    '(Pending) Credit card purchase: ',
+    '(Pending) Credit card refund: ',
+    'Credit card purchase: ',
+    'Credit card refund: ',
+    'Deposit: ',
+    'Withdrawal: ',
+    '(Pending) ',
+)
+# Alternatives are tried left to right, so list order is preserved
+PREFIX_RE = re.compile('|'.join(re.escape(prefix) for prefix in PREFIXES_TO_REMOVE))
+
+
+def remove_prefixes(text: str) -> str:
+    """Remove common prefixes from transaction descriptions."""
+    match = PREFIX_RE.match(text)
+    if match:
+        return text[match.end():].strip()
+    return text
+
+
+# CSV headers; column order matters for Monarch
+TRANSACTION_FIELDNAMES = ('Date', 'Merchant', 'Category', 'Account', 'Original Statement', 'Notes', 'Amount', 'Tags')
+BALANCE_FIELDNAMES = ('Date', 'Amount')
+
+# One transactions CSV row, with fields in Monarch column order
+MonarchRow = namedtuple('MonarchRow', [
+    'Date', 'Merchant', 'Category', 'Account', 'Original_Statement', 'Notes', 'Amount', 'Tags',
+])
+
+
+def convert_transaction_to_monarch(transaction: dict, account_description: str, rules: dict) -> MonarchRow:
+    """Convert a Wealthsimple transaction to a Monarch CSV row."""
+    # Fields used more than once below
+    tx_type = transaction.get('type', '')
+    sub_type = transaction.get('subType')
+    amount_sign = transaction.get('amountSign')
+
     # Parse the occurredAt date
     date = format_date_for_monarch(transaction.get('occurredAt', ''))
     
     # Extract merchant from description or use transaction type
     description = transaction.get('description', '')
     
-    # Remove common prefixes that ws-api/Wealthsimple adds to descriptions
-    # Order matters: check longer/more specific prefixes first
-    prefixes_to_remove = [
-        '(Pending) Credit card purchase: ',
-        '(Pending) Credit card refund: ',
-        'Credit card purchase: ',
-        'Credit card refund: ',
-        'Deposit: ',
-        'Withdrawal: ',
-        '(Pending) ',
-    ]
-    
-    def remove_prefixes(text: str) -> str:
-        """Remove common prefixes from transaction descriptions."""
-        for prefix in prefixes_to_remove:
-            if text.startswith(prefix):
-                return text[len(prefix):].strip()
-        return text
-    
-    # Clean up merchant name by removing common prefixes
-    merchant = description if description else transaction.get('type', 'Unknown')
-    merchant = remove_prefixes(merchant)
+    # Clean up description by removing common prefixes (once; the merchant
+    # and original statement share the result)
+    cleaned = remove_prefixes(description) if description else description
+    merchant = cleaned if description else transaction.get('type', 'Unknown')
     
     # Auto-categorize based on transaction type and merchant name
     category = categorize_transaction(
-        tx_type=transaction.get('type', ''),
-        sub_type=transaction.get('subType'),
+        tx_type=tx_type,
+        sub_type=sub_type,
         merchant=merchant,
         rules=rules,
     )
@@ -196,48 +278,43 @@ def convert_transaction_to_monarch(transaction: dict, account_description: str,
     account = account_description
     
     # Original statement - also cleaned of prefixes
-    original_statement = remove_prefixes(description) if description else description
+    original_statement = cleaned
     
     # Notes include transaction type and subtype if available
-    notes_parts = []
-    if transaction.get('type'):
-        notes_parts.append(f"Type: {transaction['type']}")
-    if transaction.get('subType'):
-        notes_parts.append(f"SubType: {transaction['subType']}")
-    notes = ' | '.join(notes_parts) if notes_parts else ''
+    if tx_type and sub_type:
+        notes = f"Type: {tx_type} | SubType: {sub_type}"
+    elif tx_type:
+        notes = f"Type: {tx_type}"
+    elif sub_type:
+        notes = f"SubType: {sub_type}"
+    else:
+        notes = ''
     
     # Amount: negative for debits, positive for credits
     amount_str = transaction.get('amount', '0')
     try:
         amount = float(amount_str)
-        # If amountSign is 'negative', make it negative
-        if transaction.get('amountSign') == 'negative':
-            amount = -abs(amount)
-        elif transaction.get('amountSign') == 'positive':
-            amount = abs(amount)
-        # Special handling for DIY_BUY transactions
-        if transaction.get('type') == 'DIY_BUY':
-            amount = -abs(amount)
     except (ValueError, TypeError):
         amount = 0.0
+    # DIY_BUY transactions and 'negative' amountSign are debits; flip the
+    # sign only when it's wrong
+    if tx_type == 'DIY_BUY' or amount_sign == 'negative':
+        if amount > 0:
+            amount = -amount
+    elif amount_sign == 'positive':
+        if amount < 0:
+            amount = -amount
+    # Zero is exported as 0.00 whatever its sign in the input
+    amount = amount or 0.0
     
     # Tags are left empty
     tags = ''
     
-    return {
-        'Date': date,
-        'Merchant': merchant,
-        'Category': category,
-        'Account': account,
-        'Original Statement': original_statement,
-        'Notes': notes,
-        'Amount': f"{amount:.2f}",
-        'Tags': tags
-    }
-
-
-def convert_balance_to_monarch(balance_data: dict) -> dict:
-    """Convert Wealthsimple balance history to Monarch CSV format."""
+    return MonarchRow(date, merchant, category, account, original_statement, notes, f"{amount:.2f}", tags)
+
+
+def convert_balance_to_monarch(balance_data: dict) -> tuple:
+    """Convert a Wealthsimple balance history entry to a (Date, Amount) CSV row."""
     date = format_date_for_monarch(balance_data.get('date', ''))
     
     # Get net liquidation value
@@ -252,62 +329,78 @@ def convert_balance_to_monarch(balance_data: dict) -> dict:
     else:
         amount = 0.0
     
-    return {
-        'Date': date,
-        'Amount': f"{amount:.2f}"
-    }
+    return (date, f"{amount:.2f}")
+
 
+def export_transactions_csv(transactions: list, account_description: str, account_number: str, output_dir: Path, rules: dict) -> str:
+    """Export transactions to CSV file in Monarch format.
 
-def export_transactions_csv(transactions: list, account_description: str, account_number: str, output_dir: Path, rules: dict):
-    """Export transactions to CSV file in Monarch format."""
+    Transactions are given in API order (newest first) and written in
+    chronological order (oldest first).
+
+    Returns a status message for the account's log.
+    """
     if not transactions:
-        print(f"  No transactions found for account {account_number}")
-        return
+        return f"  No transactions found for account {account_number}"
     
     # Sanitize account number for filename
     safe_account_number = sanitize_filename(account_number)
     filename = output_dir / f"{safe_account_number}_transactions.csv"
     
-    # Convert transactions to Monarch format
-    monarch_transactions = [
+    # Convert transactions to Monarch format, streaming rows into the writer
+    monarch_transactions = (
         convert_transaction_to_monarch(tx, account_description, rules)
-        for tx in transactions
-    ]
+        for tx in reversed(transactions)
+    )
+    
+    # Format the whole CSV in memory, then write it in one call
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRANSACTION_FIELDNAMES)
+    writer.writerows(monarch_transactions)
     
     # Write CSV file
-    fieldnames = ['Date', 'Merchant', 'Category', 'Account', 'Original Statement', 'Notes', 'Amount', 'Tags']
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(monarch_transactions)
+        csvfile.write(buffer.getvalue())
     
-    print(f"  Exported {len(monarch_transactions)} transactions to {filename}")
+    return f"  Exported {len(transactions)} transactions to {filename}"
 
 
-def export_balances_csv(balances: list, account_number: str, output_dir: Path):
-    """Export balance history to CSV file in Monarch format."""
+def export_balances_csv(balances: list, account_number: str, output_dir: Path) -> str:
+    """Export balance history to CSV file in Monarch format.
+
+    Returns a status message for the account's log.
+    """
     if not balances:
-        print(f"  No balance history found for account {account_number}")
-        return
+        return f"  No balance history found for account {account_number}"
     
     # Sanitize account number for filename
     safe_account_number = sanitize_filename(account_number)
     filename = output_dir / f"{safe_account_number}_balances.csv"
     
-    # Convert balances to Monarch format
-    monarch_balances = [
-        convert_balance_to_monarch(bal)
-        for bal in balances
-    ]
+    # Formatted MM/DD/YYYY dates and 2-decimal amounts never need CSV
+    # quoting, so those rows are formatted directly. Unparseable dates are
+    # passed through raw and may contain commas or quotes, so csv.writer
+    # formats those rows. Lines end in \r\n like csv.writer's.
+    lines = [','.join(BALANCE_FIELDNAMES)]
+    raw_row = io.StringIO()
+    raw_writer = csv.writer(raw_row)
+    for bal in balances:
+        date, amount = convert_balance_to_monarch(bal)
+        if date in unparsed_dates:
+            raw_row.seek(0)
+            raw_row.truncate()
+            raw_writer.writerow((date, amount))
+            lines.append(raw_row.getvalue()[:-2])  # Without its \r\n
+        else:
+            lines.append(f"{date},{amount}")
+    lines.append('')
     
     # Write CSV file
-    fieldnames = ['Date', 'Amount']
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(monarch_balances)
+        csvfile.write('\r\n'.join(lines))
     
-    print(f"  Exported {len(monarch_balances)} balance records to {filename}")
+    return f"  Exported {len(balances)} balance records to {filename}"
 
 
 def authenticate_wealthsimple(keyring_service_name: str = "morsimple.wealthsimple") -> Tuple[WealthsimpleAPI, str]:
@@ -317,10 +410,17 @@ def authenticate_wealthsimple(keyring_service_name: str = "morsimple.wealthsimpl
         keyring.set_password(f"{keyring_service_name}.{uname}", "session", sess)
     
     # Load saved username as default
-    config_file = Path(__file__).parent / '.config.yaml'
+    config_file = Path(__file__).parent / '.config.json'
+    legacy_config_file = Path(__file__).parent / '.config.yaml'
     saved_username = ''
     if config_file.exists():
-        with open(config_file, 'r') as f:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f) or {}
+            saved_username = config.get('username', '')
+    elif legacy_config_file.exists():
+        # One-time migration: the JSON config written below is preferred next run
+        import yaml
+        with open(legacy_config_file, 'r') as f:
             config = yaml.safe_load(f) or {}
             saved_username = config.get('username', '')
 
@@ -333,8 +433,8 @@ def authenticate_wealthsimple(keyring_service_name: str = "morsimple.wealthsimpl
         username = input("Wealthsimple username (email): ").strip()
 
     # Save username for next time
-    with open(config_file, 'w') as f:
-        yaml.dump({'username': username}, f)
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({'username': username}, f)
     session = keyring.get_password(f"{keyring_service_name}.{username}", "session")
     
     if session:
@@ -375,6 +475,46 @@ def authenticate_wealthsimple(keyring_service_name: str = "morsimple.wealthsimpl
     return ws, username
 
 
+def process_account(account: dict, ws: WealthsimpleAPI, args: argparse.Namespace, rules: dict, output_dir: Path) -> List[str]:
+    """Fetch and export transactions and balance history for one account.
+
+    Runs on a worker thread. The API client's HTTP session isn't thread-safe,
+    so each call works on its own client built from the shared session, and
+    log lines are returned rather than printed so each account's output
+    stays together.
+    """
+    account_id = account['id']
+    account_number = account.get('number', account_id)
+    account_description = account.get('description', account_number)
+    currency = account.get('currency', 'CAD')
+
+    log = [f"\nProcessing account: {account_description} ({account_number})"]
+    account_ws = WealthsimpleAPI(ws.session)
+
+    # Fetch transactions
+    try:
+        log.append("  Fetching transactions...")
+        transactions = account_ws.get_activities(
+            account_id,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            load_all=True,
+        )
+        log.append(export_transactions_csv(transactions, account_description, account_number, output_dir, rules))
+    except Exception as e:
+        log.append(f"  Error fetching transactions: {e}")
+
+    # Fetch balance history
+    try:
+        log.append("  Fetching balance history...")
+        balances = account_ws.get_account_historical_financials(account_id, currency)
+        log.append(export_balances_csv(balances, account_number, output_dir))
+    except Exception as e:
+        log.append(f"  Error fetching balance history: {e}")
+
+    return log
+
+
 def parse_date(date_str: str) -> datetime:
     """Parse a date string in YYYY-MM-DD format."""
     try:
@@ -434,44 +574,43 @@ def main():
 
         print(f"Processing {len(accounts)} account(s)...")
 
-        # Process each account
-        for account in accounts:
-            account_id = account['id']
-            account_number = account.get('number', account_id)
-            account_description = account.get('description', account_number)
-            currency = account.get('currency', 'CAD')
-
-            print(f"\nProcessing account: {account_description} ({account_number})")
-
-            # Fetch transactions
-            try:
-                print("  Fetching transactions...")
-                transactions = ws.get_activities(
-                    account_id,
-                    start_date=args.start_date,
-                    end_date=args.end_date,
-                    load_all=True,
-                )
-                # Reverse to get chronological order (oldest first)
-                if transactions:
-                    transactions.reverse()
-                export_transactions_csv(transactions, account_description, account_number, output_dir, rules)
-            except Exception as e:
-                print(f"  Error fetching transactions: {e}")
-
-            # Fetch balance history
-            try:
-                print("  Fetching balance history...")
-                balances = ws.get_account_historical_financials(account_id, currency)
-                export_balances_csv(balances, account_number, output_dir)
-            except Exception as e:
-                print(f"  Error fetching balance history: {e}")
+        # Process accounts concurrently; logs are printed in selection order
+        workers = max(1, min(MAX_FETCH_WORKERS, len(accounts)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [
+            executor.submit(process_account, account, ws, args, rules, output_dir)
+            for account in accounts
+        ]
+        wait = True
+        try:
+            for future in futures:
+                print('\n'.join(future.result()))
+        except KeyboardInterrupt:
+            # Drop queued accounts and don't wait for in-flight ones, so the
+            # cancellation is reported right away
+            wait = False
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=wait)
+
+        if unparsed_dates:
+            print(f"\nWarning: Could not parse {len(unparsed_dates)} date(s); exported them unchanged:")
+            for date_str in sorted(unparsed_dates, key=str):
+                print(f"  '{date_str}'")
 
         print("\n" + "=" * 50)
         print("Export complete! CSV files are in the 'output' directory.")
 
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
+        if threading.active_count() > 1:
+            # Export workers can't be interrupted mid-request, and normal
+            # interpreter exit would wait for them; leave without joining
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(0)
     except Exception as e:
         print(f"\nError: {e}")
         import traceback
@@ -6,147 +6,130 @@ This script validates that exported CSV files conform to Monarch Money's
 required format for transaction and balance history imports.
 """
 
+import argparse
 import csv
+import datetime
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Tuple, Dict
 
 
+# Per-file error limit; malformed files otherwise get one error per row
+DEFAULT_MAX_ERRORS = 100
+
+# Read buffer for CSVs being validated, so a whole export is read in a few syscalls
+CSV_READ_BUFFER = 1 << 20
+
+# Monarch's required columns, in order
+TRANSACTION_COLUMNS = ('Date', 'Merchant', 'Category', 'Account',
+                       'Original Statement', 'Notes', 'Amount', 'Tags')
+TRANSACTION_COLUMN_SET = frozenset(TRANSACTION_COLUMNS)
+BALANCE_COLUMNS = ('Date', 'Amount')
+BALANCE_COLUMN_SET = frozenset(BALANCE_COLUMNS)
+
+# MM/DD/YYYY, capturing month, day and year
+DATE_RE = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+
+
+@lru_cache(maxsize=4096)
 def validate_date_format(date_str: str) -> Tuple[bool, str]:
-    """Validate that date is in MM/DD/YYYY format."""
-    pattern = r'^\d{2}/\d{2}/\d{4}$'
-    if not re.match(pattern, date_str):
+    """Validate that date is in MM/DD/YYYY format.
+
+    Results are cached per input string; exports repeat the same dates on
+    many rows.
+    """
+    m = DATE_RE.match(date_str)
+    if not m:
         return False, f"Date '{date_str}' is not in MM/DD/YYYY format"
     
-    # Additional validation: check if it's a valid date
+    # Additional validation: check if it's a real calendar date (including
+    # month lengths and leap years)
+    month, day, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
     try:
-        parts = date_str.split('/')
-        month, day, year = int(parts[0]), int(parts[1]), int(parts[2])
+        # date() rejects year 0; 2000 is also a leap year, so it stands in
+        # for the calendar check and the range check below reports the year
+        datetime.date(year or 2000, month, day)
+    except ValueError:
         if month < 1 or month > 12:
             return False, f"Invalid month: {month}"
-        if day < 1 or day > 31:
-            return False, f"Invalid day: {day}"
-        if year < 1900 or year > 2100:
-            return False, f"Year {year} seems unreasonable"
-    except (ValueError, IndexError) as e:
-        return False, f"Could not parse date: {e}"
+        return False, f"Invalid day: {day}"
+    if year < 1900 or year > 2100:
+        return False, f"Year {year} seems unreasonable"
     
     return True, ""
 
 
+@lru_cache(maxsize=4096)
 def validate_amount_format(amount_str: str) -> Tuple[bool, str]:
-    """Validate that amount is a properly formatted decimal number."""
-    try:
-        amount = float(amount_str)
-        # Check if it has at most 2 decimal places
-        if '.' in amount_str:
-            decimal_part = amount_str.split('.')[1]
-            if len(decimal_part) > 2:
-                return False, f"Amount '{amount_str}' has more than 2 decimal places"
-        return True, ""
-    except ValueError:
-        return False, f"Amount '{amount_str}' is not a valid number"
+    """Validate that amount is a properly formatted decimal number (cached)."""
+    # Plain [sign]digits[.digits] amounts are always valid numbers; only
+    # anything else needs a float() parse
+    unsigned = amount_str[1:] if amount_str[:1] in ('-', '+') else amount_str
+    if not unsigned.replace('.', '', 1).isdecimal():
+        try:
+            float(amount_str)
+        except ValueError:
+            return False, f"Amount '{amount_str}' is not a valid number"
+    
+    # Check if it has at most 2 decimal places
+    dot = amount_str.rfind('.')
+    if dot != -1 and len(amount_str) - dot - 1 > 2:
+        return False, f"Amount '{amount_str}' has more than 2 decimal places"
+    return True, ""
 
 
-def validate_transactions_csv(filepath: Path) -> Tuple[bool, List[str]]:
-    """Validate a transactions CSV file against Monarch format."""
-    errors = []
-    required_columns = ['Date', 'Merchant', 'Category', 'Account', 
-                       'Original Statement', 'Notes', 'Amount', 'Tags']
-    
-    if not filepath.exists():
-        return False, [f"File does not exist: {filepath}"]
-    
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            # Check headers
-            if not reader.fieldnames:
-                return False, ["CSV file has no headers"]
-            
-            missing_columns = set(required_columns) - set(reader.fieldnames)
-            if missing_columns:
-                errors.append(f"Missing required columns: {', '.join(missing_columns)}")
-            
-            extra_columns = set(reader.fieldnames) - set(required_columns)
-            if extra_columns:
-                errors.append(f"Unexpected columns: {', '.join(extra_columns)}")
-            
-            # Check column order (Monarch is strict about this)
-            if list(reader.fieldnames) != required_columns:
-                errors.append(f"Column order is incorrect. Expected: {required_columns}")
-            
-            # Validate each row
-            row_num = 1
-            for row in reader:
-                row_num += 1
-                
-                # Validate date
-                date = row.get('Date', '').strip()
-                if date:
-                    valid, msg = validate_date_format(date)
-                    if not valid:
-                        errors.append(f"Row {row_num}: {msg}")
-                
-                # Validate amount
-                amount = row.get('Amount', '').strip()
-                if amount:
-                    valid, msg = validate_amount_format(amount)
-                    if not valid:
-                        errors.append(f"Row {row_num}: {msg}")
-                
-                # Check for empty required fields (some can be empty, but warn)
-                if not row.get('Date', '').strip():
-                    errors.append(f"Row {row_num}: Date is empty")
-                if not row.get('Amount', '').strip():
-                    errors.append(f"Row {row_num}: Amount is empty")
-            
-            if row_num == 1:
-                errors.append("CSV file contains no data rows (only headers)")
-    
-    except Exception as e:
-        return False, [f"Error reading CSV file: {e}"]
-    
-    return len(errors) == 0, errors
+def _column_index(header: List[str], name: str) -> int:
+    """Return the position of a column in the header, or -1 if it's absent."""
+    return header.index(name) if name in header else -1
+
 
+def _validate_csv(filepath: Path, columns: Tuple[str, ...], column_set: frozenset,
+                  max_errors: int) -> Tuple[bool, List[str]]:
+    """Validate a CSV file's header against columns and its Date/Amount rows.
 
-def validate_balances_csv(filepath: Path) -> Tuple[bool, List[str]]:
-    """Validate a balance history CSV file against Monarch format."""
+    Shared by the transaction and balance validators, which differ only in
+    their required columns.
+    """
     errors = []
-    required_columns = ['Date', 'Amount']
-    
-    if not filepath.exists():
-        return False, [f"File does not exist: {filepath}"]
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        with open(filepath, 'r', encoding='utf-8', newline='', buffering=CSV_READ_BUFFER) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
             
             # Check headers
-            if not reader.fieldnames:
+            if not header:
                 return False, ["CSV file has no headers"]
             
-            missing_columns = set(required_columns) - set(reader.fieldnames)
+            # Headers are a handful of names, so plain scans beat building sets;
+            # they also list columns in a stable order
+            missing_columns = [column for column in columns if column not in header]
             if missing_columns:
                 errors.append(f"Missing required columns: {', '.join(missing_columns)}")
             
-            extra_columns = set(reader.fieldnames) - set(required_columns)
+            extra_columns = [column for column in header if column not in column_set]
             if extra_columns:
                 errors.append(f"Unexpected columns: {', '.join(extra_columns)}")
             
-            # Check column order
-            if list(reader.fieldnames) != required_columns:
-                errors.append(f"Column order is incorrect. Expected: {required_columns}")
+            # Check column order (Monarch is strict about this)
+            if tuple(header) != columns:
+                errors.append(f"Column order is incorrect. Expected: {list(columns)}")
             
-            # Validate each row
+            # Validate each row, reading the two checked fields by position
+            date_idx = _column_index(header, 'Date')
+            amount_idx = _column_index(header, 'Amount')
             row_num = 1
             for row in reader:
+                if not row:
+                    continue  # Blank line
                 row_num += 1
                 
                 # Validate date
-                date = row.get('Date', '').strip()
+                date = row[date_idx].strip() if 0 <= date_idx < len(row) else ''
                 if date:
                     valid, msg = validate_date_format(date)
                     if not valid:
@@ -155,24 +138,59 @@ def validate_balances_csv(filepath: Path) -> Tuple[bool, List[str]]:
                     errors.append(f"Row {row_num}: Date is empty")
                 
                 # Validate amount
-                amount = row.get('Amount', '').strip()
+                amount = row[amount_idx].strip() if 0 <= amount_idx < len(row) else ''
                 if amount:
                     valid, msg = validate_amount_format(amount)
                     if not valid:
                         errors.append(f"Row {row_num}: {msg}")
                 else:
                     errors.append(f"Row {row_num}: Amount is empty")
+                
+                if max_errors > 0 and len(errors) >= max_errors:
+                    # Only mention skipped rows if any non-blank ones remain
+                    if any(reader):
+                        errors.append(f"Stopped after {len(errors)} errors; later rows were not checked")
+                    break
             
             if row_num == 1:
                 errors.append("CSV file contains no data rows (only headers)")
     
+    except FileNotFoundError:
+        return False, [f"File does not exist: {filepath}"]
     except Exception as e:
         return False, [f"Error reading CSV file: {e}"]
     
     return len(errors) == 0, errors
 
 
-def validate_all_csvs(output_dir: Path = Path("output")) -> Tuple[bool, Dict[str, List[str]]]:
+def validate_transactions_csv(filepath: Path, max_errors: int = DEFAULT_MAX_ERRORS) -> Tuple[bool, List[str]]:
+    """Validate a transactions CSV file against Monarch format.
+
+    Stops checking rows once max_errors errors are found (0 for no limit).
+    """
+    return _validate_csv(filepath, TRANSACTION_COLUMNS, TRANSACTION_COLUMN_SET, max_errors)
+
+
+def validate_balances_csv(filepath: Path, max_errors: int = DEFAULT_MAX_ERRORS) -> Tuple[bool, List[str]]:
+    """Validate a balance history CSV file against Monarch format.
+
+    Stops checking rows once max_errors errors are found (0 for no limit).
+    """
+    return _validate_csv(filepath, BALANCE_COLUMNS, BALANCE_COLUMN_SET, max_errors)
+
+
+def _validate_one(work: Tuple[str, Path, int]) -> Tuple[bool, List[str]]:
+    """Validate one ('transactions' | 'balances', path, max_errors) work item.
+
+    Module-level so it can be sent to ProcessPoolExecutor workers.
+    """
+    kind, path, max_errors = work
+    if kind == 'transactions':
+        return validate_transactions_csv(path, max_errors)
+    return validate_balances_csv(path, max_errors)
+
+
+def validate_all_csvs(output_dir: Path = Path("output"), max_errors: int = DEFAULT_MAX_ERRORS) -> Tuple[bool, Dict[str, List[str]]]:
     """Validate all CSV files in the output directory."""
     all_results = {}
     all_valid = True
@@ -180,34 +198,54 @@ def validate_all_csvs(output_dir: Path = Path("output")) -> Tuple[bool, Dict[str
     if not output_dir.exists():
         return False, {"error": [f"Output directory does not exist: {output_dir}"]}
     
-    # Find all CSV files
-    transaction_files = list(output_dir.glob("*_transactions.csv"))
-    balance_files = list(output_dir.glob("*_balances.csv"))
+    # Find all CSV files in one pass over the directory
+    transaction_files = []
+    balance_files = []
+    try:
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('_transactions.csv'):
+                    transaction_files.append(Path(entry.path))
+                elif entry.name.endswith('_balances.csv'):
+                    balance_files.append(Path(entry.path))
+    except OSError:
+        # Not a directory or not readable; like glob(), treat it as empty
+        pass
     
     if not transaction_files and not balance_files:
         return False, {"error": [f"No CSV files found in {output_dir}"]}
     
-    # Validate transaction files
-    for tx_file in transaction_files:
-        valid, errors = validate_transactions_csv(tx_file)
-        all_results[str(tx_file.name)] = errors
-        if not valid:
-            all_valid = False
+    # Validate transaction files, then balance files. Files are independent
+    # and validation is CPU-bound, so several files run in worker processes.
+    work = ([('transactions', path, max_errors) for path in transaction_files]
+            + [('balances', path, max_errors) for path in balance_files])
+    if len(work) == 1:
+        outcomes = [_validate_one(work[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(work), os.cpu_count() or 1)) as executor:
+            outcomes = list(executor.map(_validate_one, work))
     
-    # Validate balance files
-    for bal_file in balance_files:
-        valid, errors = validate_balances_csv(bal_file)
-        all_results[str(bal_file.name)] = errors
+    for (_, path, _), (valid, errors) in zip(work, outcomes):
+        all_results[str(path.name)] = errors
         if not valid:
             all_valid = False
     
     return all_valid, all_results
 
 
+def _non_negative_int(value: str) -> int:
+    """argparse type for --max-errors: an integer >= 0."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"must be an integer, got '{value}'")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {number}")
+    return number
+
+
 def main():
     """Main function to validate CSV files."""
-    import argparse
-    
     parser = argparse.ArgumentParser(
         description="Validate CSV files for Monarch Money import format"
     )
@@ -222,6 +260,12 @@ def main():
         default=Path("output"),
         help='Directory containing CSV files (default: output/)'
     )
+    parser.add_argument(
+        '--max-errors',
+        type=_non_negative_int,
+        default=DEFAULT_MAX_ERRORS,
+        help=f'Stop checking a file after this many errors, 0 for no limit (default: {DEFAULT_MAX_ERRORS})'
+    )
     
     args = parser.parse_args()
     
@@ -231,9 +275,9 @@ def main():
         for filepath in args.files:
             path = Path(filepath)
             if '_transactions.csv' in path.name:
-                valid, errors = validate_transactions_csv(path)
+                valid, errors = validate_transactions_csv(path, args.max_errors)
             elif '_balances.csv' in path.name:
-                valid, errors = validate_balances_csv(path)
+                valid, errors = validate_balances_csv(path, args.max_errors)
             else:
                 print(f"Warning: Unknown file type for {path.name}")
                 continue
@@ -250,7 +294,7 @@ def main():
     else:
         # Validate all files in output directory
         print(f"Validating all CSV files in {args.output_dir}...")
-        valid, results = validate_all_csvs(args.output_dir)
+        valid, results = validate_all_csvs(args.output_dir, args.max_errors)
         
         if valid:
             print("✓ All CSV files are valid!")